@@ -5,25 +5,33 @@ Returns only markdown output (regular and no-header-footer versions).
 """
 
 import os
-import io
+import shutil
+import asyncio
 import tempfile
 import traceback
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, List, Tuple
 from pathlib import Path
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
 import uvicorn
 from PIL import Image
 
 from dots_ocr.parser import DotsOCRParser
+from dots_ocr.utils.doc_utils import load_images_from_pdf
+from dots_ocr.utils.image_utils import to_rgb
 from dots_ocr.utils.format_transformer import layoutjson2md
 
 
 app = FastAPI(
     title="dots.ocr API Server",
     description="Document parsing service returning markdown content",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson encodes the large markdown strings much faster than stdlib json
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware for web clients
@@ -38,6 +46,11 @@ app.add_middleware(
 # Initialize parser (will use vLLM backend by default)
 parser = None
 
+# Thread pool for blocking work (image decode, vLLM calls, post-processing)
+# so the event loop stays free to admit concurrent requests
+MAX_WORKERS = int(os.environ.get("DOTS_OCR_MAX_WORKERS", "64"))
+EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize the DotsOCR parser on startup."""
@@ -61,6 +74,56 @@ async def startup_event():
         raise
 
 
+def _parse_image_to_markdown(image: Image.Image, prompt_mode: str) -> Tuple[str, str]:
+    """
+    Run the DotsOCR pipeline on a PIL image and return its markdown output.
+    
+    Args:
+        image: RGB image to parse
+        prompt_mode: Parsing mode
+        
+    Returns:
+        tuple: (markdown, markdown_nohf)
+    """
+    # Create temporary directory for processing
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Use the original parser's _parse_single_image method
+        result = parser._parse_single_image(
+            origin_image=image,
+            prompt_mode=prompt_mode, 
+            save_dir=temp_dir,
+            save_name="temp_result",
+            source="image"
+        )
+        
+        # Read the generated markdown files
+        markdown_regular = ""
+        markdown_nohf = ""
+        
+        md_file = result.get('md_content_path')
+        md_nohf_file = result.get('md_content_nohf_path')
+        
+        if md_file and os.path.exists(md_file):
+            with open(md_file, 'r', encoding='utf-8') as f:
+                markdown_regular = f.read()
+                
+        if md_nohf_file and os.path.exists(md_nohf_file):
+            with open(md_nohf_file, 'r', encoding='utf-8') as f:
+                markdown_nohf = f.read()
+    
+    return markdown_regular, markdown_nohf
+
+
+def _decode_image(file_obj: BinaryIO) -> Image.Image:
+    """Decode an uploaded file object into an RGB PIL Image."""
+    image = Image.open(file_obj)
+    # Force the decode while the upload's spooled file is still open
+    image.load()
+    # Single RGB conversion; to_rgb returns RGB images as-is, so the parser's
+    # own fetch_image() does not convert again
+    return to_rgb(image)
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -103,60 +166,22 @@ async def parse_document(
         raise HTTPException(status_code=400, detail="File must be an image")
     
     try:
-        # Read uploaded file
-        file_content = await file.read()
+        loop = asyncio.get_running_loop()
         
-        # Convert to PIL Image
-        image = Image.open(io.BytesIO(file_content))
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        # Decode straight from the spooled upload without buffering it in memory
+        image = await loop.run_in_executor(EXECUTOR, _decode_image, file.file)
         
-        # Create temporary file for processing
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
-            image.save(temp_file.name, format='PNG')
-            temp_path = temp_file.name
+        markdown_regular, markdown_nohf = await loop.run_in_executor(
+            EXECUTOR, _parse_image_to_markdown, image, prompt_mode
+        )
         
-        try:
-            # Use the proper parsing logic from DotsOCRParser
-            import os
-            
-            # Create temporary directory for processing
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Use the original parser's _parse_single_image method
-                result = parser._parse_single_image(
-                    origin_image=image,
-                    prompt_mode=prompt_mode, 
-                    save_dir=temp_dir,
-                    save_name="temp_result",
-                    source="image"
-                )
-                
-                # Read the generated markdown files
-                markdown_regular = ""
-                markdown_nohf = ""
-                
-                md_file = os.path.join(temp_dir, "temp_result.md")
-                md_nohf_file = os.path.join(temp_dir, "temp_result_nohf.md")
-                
-                if os.path.exists(md_file):
-                    with open(md_file, 'r', encoding='utf-8') as f:
-                        markdown_regular = f.read()
-                        
-                if os.path.exists(md_nohf_file):
-                    with open(md_nohf_file, 'r', encoding='utf-8') as f:
-                        markdown_nohf = f.read()
-            
-            return {
-                "status": "success",
-                "filename": file.filename,
-                "prompt_mode": prompt_mode,
-                "markdown": markdown_regular,
-                "markdown_nohf": markdown_nohf
-            }
-            
-        finally:
-            # Clean up temporary file
-            os.unlink(temp_path)
+        return {
+            "status": "success",
+            "filename": file.filename,
+            "prompt_mode": prompt_mode,
+            "markdown": markdown_regular,
+            "markdown_nohf": markdown_nohf
+        }
             
     except Exception as e:
         print(f"Error processing file {file.filename}: {e}")
@@ -167,14 +192,93 @@ async def parse_document(
         )
 
 
+@app.post("/parse_batch")
+async def parse_batch(
+    files: List[UploadFile] = File(...),
+    prompt_mode: str = Form(default="prompt_layout_all_en")
+) -> Dict[str, Any]:
+    """
+    Parse multiple uploaded images concurrently and return markdown for each.
+    
+    All images are submitted to the vLLM server at once so its continuous
+    batching can schedule them together instead of one request at a time.
+    
+    Args:
+        files: Uploaded image files
+        prompt_mode: Parsing mode (default: prompt_layout_all_en)
+        
+    Returns:
+        dict: Contains results list mirroring the order of the uploaded files;
+            each entry has "status" "success" with markdown, or "error" with a detail
+    """
+    global parser
+    
+    if parser is None:
+        raise HTTPException(status_code=500, detail="Parser not initialized")
+    
+    # Validate file types
+    for file in files:
+        if not file.content_type.startswith('image/'):
+            raise HTTPException(
+                status_code=400, 
+                detail=f"File must be an image: {file.filename}"
+            )
+    
+    loop = asyncio.get_running_loop()
+    
+    async def parse_file(file: UploadFile) -> Tuple[str, str]:
+        # Decode (CPU-bound) then parse, each step on the executor
+        image = await loop.run_in_executor(EXECUTOR, _decode_image, file.file)
+        return await loop.run_in_executor(
+            EXECUTOR, _parse_image_to_markdown, image, prompt_mode
+        )
+    
+    # Submit all images concurrently so vLLM batches them; a bad image
+    # only fails its own entry
+    outputs = await asyncio.gather(
+        *[parse_file(file) for file in files], return_exceptions=True
+    )
+    
+    results = []
+    for file, output in zip(files, outputs):
+        if isinstance(output, Exception):
+            print(f"Error processing image {file.filename}: {output}")
+            traceback.print_exception(output)
+            results.append({
+                "status": "error",
+                "filename": file.filename,
+                "detail": f"Error processing image: {str(output)}"
+            })
+            continue
+        
+        markdown_regular, markdown_nohf = output
+        results.append({
+            "status": "success",
+            "filename": file.filename,
+            "markdown": markdown_regular,
+            "markdown_nohf": markdown_nohf
+        })
+    
+    return {
+        "status": "success",
+        "prompt_mode": prompt_mode,
+        "total_files": len(results),
+        "results": results
+    }
+
+
 @app.post("/parse_pdf")
 async def parse_pdf(
     file: UploadFile = File(...),
     prompt_mode: str = Form(default="prompt_layout_all_en"),
     dpi: int = Form(default=200)
-) -> Dict[str, Any]:
+) -> StreamingResponse:
     """
-    Parse an uploaded PDF and return markdown content for all pages.
+    Parse an uploaded PDF and stream markdown content page by page.
+    
+    The response is newline-delimited JSON. Each page is emitted as soon as
+    it finishes (so pages may arrive out of order), followed by a final
+    summary line.
     
     Args:
         file: Uploaded PDF file
@@ -182,7 +286,10 @@ async def parse_pdf(
         dpi: DPI for PDF to image conversion
         
     Returns:
-        dict: Contains pages list with markdown content for each page
+        StreamingResponse: NDJSON lines of the form
+            {"page_number", "markdown", "markdown_nohf"} for each page, then
+            {"status": "success", "filename", "prompt_mode", "total_pages"}, or
+            {"status": "error", "detail"} if a page fails mid-stream
     """
     global parser
     
@@ -193,47 +300,79 @@ async def parse_pdf(
     if not file.content_type == 'application/pdf':
         raise HTTPException(status_code=400, detail="File must be a PDF")
     
+    filename = file.filename
+    
     try:
-        # Read uploaded file
-        file_content = await file.read()
+        loop = asyncio.get_running_loop()
         
-        # Create temporary PDF file
+        # Copy the spooled upload to a temporary PDF file without buffering it in memory
         with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-            temp_file.write(file_content)
             temp_pdf_path = temp_file.name
+            await loop.run_in_executor(EXECUTOR, shutil.copyfileobj, file.file, temp_file)
         
         try:
-            # Parse PDF using existing parser
-            parser.dpi = dpi
-            results = parser.parse(temp_pdf_path, prompt_mode=prompt_mode)
-            
-            pages = []
-            for page_result in results:
-                pages.append({
-                    "page_number": page_result.get("page_idx", 0) + 1,
-                    "markdown": page_result.get("md", ""),
-                    "markdown_nohf": page_result.get("md_nohf", "")
-                })
-            
-            return {
-                "status": "success",
-                "filename": file.filename,
-                "prompt_mode": prompt_mode,
-                "total_pages": len(pages),
-                "pages": pages
-            }
-            
+            # Rasterize all pages up front (CPU-bound)
+            images = await loop.run_in_executor(
+                EXECUTOR, load_images_from_pdf, temp_pdf_path, dpi
+            )
         finally:
             # Clean up temporary file
             os.unlink(temp_pdf_path)
             
     except Exception as e:
-        print(f"Error processing PDF {file.filename}: {e}")
+        print(f"Error processing PDF {filename}: {e}")
         traceback.print_exc()
         raise HTTPException(
             status_code=500, 
             detail=f"Error processing PDF: {str(e)}"
         )
+    
+    total_pages = len(images)
+    
+    async def parse_page(page_idx: int) -> Tuple[int, Tuple[str, str]]:
+        output = await loop.run_in_executor(
+            EXECUTOR, _parse_image_to_markdown, images[page_idx], prompt_mode
+        )
+        images[page_idx] = None  # release the page image once parsed
+        return page_idx, output
+    
+    async def page_stream():
+        tasks: List[asyncio.Task] = []
+        try:
+            # Submit all pages concurrently so vLLM batches them,
+            # and emit every page as soon as it completes
+            tasks = [asyncio.create_task(parse_page(i)) for i in range(total_pages)]
+            for next_page in asyncio.as_completed(tasks):
+                page_idx, (markdown_regular, markdown_nohf) = await next_page
+                yield orjson.dumps({
+                    "page_number": page_idx + 1,
+                    "markdown": markdown_regular,
+                    "markdown_nohf": markdown_nohf
+                }) + b"\n"
+            
+            yield orjson.dumps({
+                "status": "success",
+                "filename": filename,
+                "prompt_mode": prompt_mode,
+                "total_pages": total_pages
+            }) + b"\n"
+            
+        except Exception as e:
+            print(f"Error processing PDF {filename}: {e}")
+            traceback.print_exc()
+            yield orjson.dumps({
+                "status": "error",
+                "detail": f"Error processing PDF: {str(e)}"
+            }) + b"\n"
+            
+        finally:
+            # After a failed page or a client disconnect, stop the remaining
+            # pages and retrieve their results so no error goes unseen
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    return StreamingResponse(page_stream(), media_type="application/x-ndjson")
 
 
 if __name__ == "__main__":
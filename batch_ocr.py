@@ -6,36 +6,51 @@ Processes images in numerical order and saves only _NOHF.md files.
 
 import os
 import sys
-import requests
+import asyncio
+import httpx
 import time
+import random
 import re
+import shutil
+import hashlib
+import queue
+import threading
 from pathlib import Path
-from typing import List, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Set, Tuple, Union
 
 # Hardcoded configuration
 POD_ID = "9b569wf87rta65-8002"  # Update with your actual pod ID
 TARGET_FOLDER = "/Volumes/Storage/document/Kirkland & Ellis/M&A - PE Resources/50-50 Deals/Project Felix - Stockholders Agreement"
 OUTPUT_BASE_DIR = "./output"
+MAX_BACKOFF_SECONDS = 30
+CACHE_DIRNAME = ".ocr_cache"  # content-addressed OCR results, kept per output folder
 
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.gif'})
 
-def natural_sort_key(filename: str) -> List[Tuple[str, int]]:
+# Splits a filename into alternating text and digit runs
+_NUM_RE = re.compile(r'(\d+)')
+
+
+def natural_sort_key(filename: str) -> List[Union[str, int]]:
     """
     Generate a key for natural sorting of filenames with numbers.
     E.g., 'image (1).png', 'image (2).png', ..., 'image (10).png'
     """
-    return [(text, int(num)) if num.isdigit() else (text, 0) 
-            for text, num in re.findall(r'([^0-9]*)([0-9]*)', filename)]
+    # Text runs land on even indices and digit runs on odd ones, so keys
+    # only ever compare str with str and int with int
+    return [int(part) if i % 2 else part
+            for i, part in enumerate(_NUM_RE.split(filename))]
 
 
 def get_image_files(folder_path: str) -> List[str]:
     """Get all image files from folder, sorted naturally."""
-    image_extensions = {'.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.gif'}
-    
-    image_files = []
-    for file in os.listdir(folder_path):
-        if any(file.lower().endswith(ext) for ext in image_extensions):
-            image_files.append(os.path.join(folder_path, file))
+    with os.scandir(folder_path) as entries:
+        image_files = [
+            entry.path for entry in entries
+            # Skip hidden files such as macOS "._" resource forks
+            if not entry.name.startswith('.')
+            and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+        ]
     
     # Sort naturally (handles numbers correctly)
     image_files.sort(key=lambda x: natural_sort_key(os.path.basename(x)))
@@ -43,7 +58,90 @@ def get_image_files(folder_path: str) -> List[str]:
     return image_files
 
 
-def process_single_image(
+class OutputWriter:
+    """
+    Performs file writes and copies on one background thread.
+    
+    Upload tasks only enqueue their output, so they never wait on disk
+    (or a network mount). Jobs run in submission order, so a copy queued
+    after a write always sees the written file. Destinations whose job
+    failed are collected in `failed` once close() returns.
+    """
+    
+    def __init__(self):
+        self._jobs: queue.Queue = queue.Queue()
+        self.failed: Set[str] = set()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            dest, func, args = job
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"❌ Error writing {os.path.basename(dest)}: {e}")
+                self.failed.add(dest)
+    
+    def _copy(self, src: str, dst: str):
+        # Never propagate a result whose own write failed (or an older file left at src)
+        if src in self.failed:
+            raise RuntimeError(f"source {os.path.basename(src)} was not written")
+        # Copy via a temp file so a failed copy never leaves a partial dst
+        tmp_path = f"{dst}.tmp"
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    
+    def write_text(self, path: str, text: str):
+        self._jobs.put((path, write_text_file, (path, text)))
+    
+    def copy(self, src: str, dst: str):
+        self._jobs.put((dst, self._copy, (src, dst)))
+    
+    def close(self):
+        """Flush all pending jobs and stop the thread."""
+        self._jobs.put(None)
+        self._thread.join()
+
+
+def write_text_file(path: str, text: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def nohf_output_path(output_dir: str, image_path: str) -> str:
+    """Path of the _NOHF.md file written for an image."""
+    return os.path.join(output_dir, f"{Path(image_path).stem}_NOHF.md")
+
+
+def hash_file(path: str) -> str:
+    """Hash a file's bytes so identical pages can share one OCR result."""
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'blake2b').hexdigest()
+
+
+def cache_path(output_dir: str, prompt_mode: str, digest: str) -> str:
+    """
+    Path of the cached result for an image's content hash.
+    
+    Results are stored under their input hash rather than an image name,
+    so an entry can never be overwritten with another image's output.
+    """
+    return os.path.join(output_dir, CACHE_DIRNAME, prompt_mode, f"{digest}.md")
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given retry attempt."""
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, 2 ** (attempt + 1)))
+
+
+async def process_single_image(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    writer: OutputWriter,
     image_path: str,
     output_dir: str,
     prompt_mode: str = "prompt_layout_all_en",
@@ -58,32 +156,31 @@ def process_single_image(
     
     for attempt in range(max_retries):
         try:
-            print(f"📷 Processing: {filename} (attempt {attempt + 1}/{max_retries})")
-            
-            start_time = time.time()
-            
-            with open(image_path, 'rb') as f:
-                files = {'file': (os.path.basename(image_path), f, 'image/png')}
+            async with semaphore:
+                print(f"📷 Processing: {filename} (attempt {attempt + 1}/{max_retries})")
+                
+                start_time = time.time()
+                
+                image_bytes = await asyncio.to_thread(Path(image_path).read_bytes)
+                files = {'file': (os.path.basename(image_path), image_bytes, 'image/png')}
                 data = {'prompt_mode': prompt_mode}
                 
-                response = requests.post(
+                response = await client.post(
                     parse_url,
                     files=files,
-                    data=data,
-                    timeout=95
+                    data=data
                 )
-            
-            end_time = time.time()
-            response_time = end_time - start_time
+                
+                end_time = time.time()
+                response_time = end_time - start_time
             
             if response.status_code == 200:
                 result = response.json()
                 
                 if result.get('status') == 'success':
                     # Save only the _NOHF.md file
-                    nohf_file = os.path.join(output_dir, f"{filename}_NOHF.md")
-                    with open(nohf_file, 'w', encoding='utf-8') as f:
-                        f.write(result.get('markdown_nohf', ''))
+                    nohf_file = nohf_output_path(output_dir, image_path)
+                    writer.write_text(nohf_file, result.get('markdown_nohf', ''))
                     
                     print(f"✅ {filename} → {os.path.basename(nohf_file)} ({response_time:.1f}s)")
                     return True
@@ -93,26 +190,26 @@ def process_single_image(
             else:
                 print(f"❌ HTTP {response.status_code} for {filename}: {response.text}")
                 
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             print(f"⏰ Timeout for {filename} (attempt {attempt + 1}/{max_retries})")
-            if attempt < max_retries - 1:
-                time.sleep(2)  # Brief pause before retry
             
         except Exception as e:
             print(f"❌ Error processing {filename}: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2)
+        
+        # Jittered pause before retry so workers don't re-hit the server in lockstep
+        if attempt < max_retries - 1:
+            await asyncio.sleep(backoff_delay(attempt))
     
     print(f"❌ Failed to process {filename} after {max_retries} attempts")
     return False
 
 
-def process_folder(
+async def process_folder_async(
     folder_path: str,
     prompt_mode: str = "prompt_layout_all_en",
     max_workers: int = 3
 ):
-    """Process all images in a folder."""
+    """Process all images in a folder with up to max_workers requests in flight."""
     
     if not os.path.exists(folder_path):
         print(f"❌ Folder not found: {folder_path}")
@@ -139,45 +236,87 @@ def process_folder(
     print(f"   📡 Pod ID: {POD_ID}")
     print()
     
-    # Health check
-    health_url = f"https://{POD_ID}.proxy.runpod.net/health"
-    try:
-        response = requests.get(health_url, timeout=10)
-        if response.status_code != 200:
-            print(f"❌ Health check failed: {response.status_code}")
+    # One client for the health check and all uploads; HTTP/2 multiplexes
+    # concurrent requests over the pooled connections
+    limits = httpx.Limits(max_connections=max_workers)
+    async with httpx.AsyncClient(http2=True, timeout=95, limits=limits) as client:
+        # Health check
+        health_url = f"https://{POD_ID}.proxy.runpod.net/health"
+        try:
+            response = await client.get(health_url, timeout=10)
+            if response.status_code != 200:
+                print(f"❌ Health check failed: {response.status_code}")
+                return
+            print("✅ RunPod service is healthy")
+        except Exception as e:
+            print(f"❌ Health check failed: {e}")
             return
-        print("✅ RunPod service is healthy")
-    except Exception as e:
-        print(f"❌ Health check failed: {e}")
-        return
-    
-    # Process images with thread pool
-    successful = 0
-    failed = 0
-    start_time = time.time()
-    
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks
-        future_to_file = {
-            executor.submit(
-                process_single_image,
-                image_path,
-                output_dir,
-                prompt_mode
-            ): image_path for image_path in image_files
-        }
         
-        # Process completed tasks
-        for future in as_completed(future_to_file):
-            image_path = future_to_file[future]
+        start_time = time.time()
+        
+        os.makedirs(os.path.join(output_dir, CACHE_DIRNAME, prompt_mode), exist_ok=True)
+        writer = OutputWriter()
+        # Bounds the number of uploads in flight
+        semaphore = asyncio.Semaphore(max_workers)
+        
+        # content hash -> (first image with that content, task OCR'ing it)
+        in_flight: Dict[str, Tuple[str, asyncio.Task]] = {}
+        
+        async def ocr_and_cache(image_path: str, digest: str) -> bool:
+            if not await process_single_image(client, semaphore, writer, image_path, output_dir, prompt_mode):
+                return False
+            # Queued after the write, and skipped by the writer if that write failed
+            writer.copy(nohf_output_path(output_dir, image_path), cache_path(output_dir, prompt_mode, digest))
+            return True
+        
+        async def process_image(image_path: str) -> bool:
+            # Each image is hashed in its own task, so uploads start right away
+            # and an unreadable file only fails itself
             try:
-                if future.result():
-                    successful += 1
-                else:
-                    failed += 1
-            except Exception as e:
-                print(f"❌ Unexpected error for {os.path.basename(image_path)}: {e}")
-                failed += 1
+                digest = await asyncio.to_thread(hash_file, image_path)
+            except OSError as e:
+                print(f"❌ Error reading {os.path.basename(image_path)}: {e}")
+                return False
+            
+            nohf_file = nohf_output_path(output_dir, image_path)
+            
+            # Reuse results from earlier runs straight from the cache
+            cached_file = cache_path(output_dir, prompt_mode, digest)
+            if os.path.isfile(cached_file):
+                writer.copy(cached_file, nohf_file)
+                print(f"♻️  {Path(image_path).stem} → {os.path.basename(nohf_file)} (cached)")
+                return True
+            
+            # Identical images are OCR'd only once; later ones copy the first's result
+            if digest in in_flight:
+                source_path, task = in_flight[digest]
+                if not await task:
+                    return False
+                writer.copy(nohf_output_path(output_dir, source_path), nohf_file)
+                print(f"♻️  {Path(image_path).stem} → {os.path.basename(nohf_file)} (duplicate)")
+                return True
+            
+            task = asyncio.ensure_future(ocr_and_cache(image_path, digest))
+            in_flight[digest] = (image_path, task)
+            return await task
+        
+        results = await asyncio.gather(*[
+            process_image(image_path) for image_path in image_files
+        ], return_exceptions=True)
+        
+        # Wait for queued writes before checking which ones succeeded
+        await asyncio.to_thread(writer.close)
+    
+    # An image only counts as done once its _NOHF.md is actually on disk
+    failed_images = set()
+    for image_path, result in zip(image_files, results):
+        if isinstance(result, Exception):
+            print(f"❌ Unexpected error for {os.path.basename(image_path)}: {result}")
+        if result is not True or nohf_output_path(output_dir, image_path) in writer.failed:
+            failed_images.add(image_path)
+    
+    failed = len(failed_images)
+    successful = len(image_files) - failed
     
     # Summary
     total_time = time.time() - start_time
@@ -189,6 +328,15 @@ def process_folder(
     print(f"   ⚡ Avg per image: {total_time/len(image_files):.1f}s")
 
 
+def process_folder(
+    folder_path: str,
+    prompt_mode: str = "prompt_layout_all_en",
+    max_workers: int = 3
+):
+    """Process all images in a folder."""
+    asyncio.run(process_folder_async(folder_path, prompt_mode, max_workers))
+
+
 def main():
     import argparse
     
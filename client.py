@@ -6,6 +6,7 @@ Uploads images to RunPod FastAPI endpoint and saves returned markdown files.
 
 import os
 import sys
+import json
 import argparse
 import requests
 import time
@@ -17,7 +18,8 @@ def upload_image_to_runpod(
     pod_id: str,
     image_path: str,
     prompt_mode: str = "prompt_layout_all_en",
-    output_dir: str = "./output"
+    output_dir: str = "./output",
+    session: Optional[requests.Session] = None
 ) -> bool:
     """
     Upload image to RunPod FastAPI endpoint and save markdown results.
@@ -27,6 +29,7 @@ def upload_image_to_runpod(
         image_path: Path to local image file
         prompt_mode: Parsing mode to use
         output_dir: Directory to save output files
+        session: Optional session to reuse pooled connections
         
     Returns:
         bool: True if successful, False otherwise
@@ -60,7 +63,7 @@ def upload_image_to_runpod(
             print(f"⏰ Request started at: {time.strftime('%H:%M:%S')}")
             
             # Make request with extended timeout for RunPod
-            response = requests.post(
+            response = (session or requests).post(
                 parse_url,
                 files=files,
                 data=data,
@@ -125,7 +128,8 @@ def upload_pdf_to_runpod(
     pdf_path: str,
     prompt_mode: str = "prompt_layout_all_en",
     output_dir: str = "./output",
-    dpi: int = 200
+    dpi: int = 200,
+    session: Optional[requests.Session] = None
 ) -> bool:
     """
     Upload PDF to RunPod FastAPI endpoint and save markdown results.
@@ -136,6 +140,7 @@ def upload_pdf_to_runpod(
         prompt_mode: Parsing mode to use
         output_dir: Directory to save output files
         dpi: DPI for PDF conversion
+        session: Optional session to reuse pooled connections
         
     Returns:
         bool: True if successful, False otherwise
@@ -164,66 +169,78 @@ def upload_pdf_to_runpod(
             files = {'file': (os.path.basename(pdf_path), f, 'application/pdf')}
             data = {'prompt_mode': prompt_mode, 'dpi': dpi}
             
-            # Make request with extended timeout
-            response = requests.post(
+            # Make request with extended timeout; pages are streamed back as
+            # newline-delimited JSON as soon as each one finishes
+            response = (session or requests).post(
                 parse_url,
                 files=files,
                 data=data,
-                timeout=95
+                timeout=95,
+                stream=True
             )
         
-        # Check response
-        if response.status_code == 200:
-            result = response.json()
+        with response:
+            # Check response
+            if response.status_code != 200:
+                print(f"❌ HTTP Error {response.status_code}: {response.text}")
+                return False
             
-            if result.get('status') == 'success':
-                print(f"✅ Successfully parsed PDF with {result.get('total_pages', 0)} pages!")
-                
-                # Save markdown files for each page
-                base_name = Path(pdf_path).stem
-                pages = result.get('pages', [])
-                
-                for page in pages:
-                    page_num = page.get('page_number', 1)
-                    
-                    # Regular markdown for this page
-                    markdown_file = os.path.join(output_dir, f"{base_name}_page{page_num}.md")
-                    with open(markdown_file, 'w', encoding='utf-8') as f:
-                        f.write(page.get('markdown', ''))
-                    print(f"📄 Saved page {page_num} markdown: {markdown_file}")
-                    
-                    # No headers/footers markdown for this page
-                    markdown_nohf_file = os.path.join(output_dir, f"{base_name}_page{page_num}_nohf.md")
-                    with open(markdown_nohf_file, 'w', encoding='utf-8') as f:
-                        f.write(page.get('markdown_nohf', ''))
-                    print(f"📄 Saved page {page_num} no-hf markdown: {markdown_nohf_file}")
-                
-                # Create combined files
-                combined_md = "\n\n---\n\n".join([p.get('markdown', '') for p in pages])
-                combined_nohf = "\n\n---\n\n".join([p.get('markdown_nohf', '') for p in pages])
+            base_name = Path(pdf_path).stem
+            pages = {}
+            result = {}
+            
+            # Save markdown files for each page as it arrives
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                message = json.loads(line)
                 
-                combined_file = os.path.join(output_dir, f"{base_name}_combined.md")
-                with open(combined_file, 'w', encoding='utf-8') as f:
-                    f.write(combined_md)
-                print(f"📄 Saved combined markdown: {combined_file}")
+                if 'page_number' not in message:
+                    result = message
+                    break
                 
-                combined_nohf_file = os.path.join(output_dir, f"{base_name}_combined_nohf.md")
-                with open(combined_nohf_file, 'w', encoding='utf-8') as f:
-                    f.write(combined_nohf)
-                print(f"📄 Saved combined no-hf markdown: {combined_nohf_file}")
+                page_num = message['page_number']
+                pages[page_num] = message
                 
-                print(f"\n📊 Summary:")
-                print(f"  Filename: {result.get('filename', 'N/A')}")
-                print(f"  Total pages: {result.get('total_pages', 0)}")
-                print(f"  Prompt mode: {result.get('prompt_mode', 'N/A')}")
+                # Regular markdown for this page
+                markdown_file = os.path.join(output_dir, f"{base_name}_page{page_num}.md")
+                with open(markdown_file, 'w', encoding='utf-8') as f:
+                    f.write(message.get('markdown', ''))
+                print(f"📄 Saved page {page_num} markdown: {markdown_file}")
                 
-                return True
-            else:
-                print(f"❌ Parse failed: {result}")
-                return False
-        else:
-            print(f"❌ HTTP Error {response.status_code}: {response.text}")
+                # No headers/footers markdown for this page
+                markdown_nohf_file = os.path.join(output_dir, f"{base_name}_page{page_num}_nohf.md")
+                with open(markdown_nohf_file, 'w', encoding='utf-8') as f:
+                    f.write(message.get('markdown_nohf', ''))
+                print(f"📄 Saved page {page_num} no-hf markdown: {markdown_nohf_file}")
+        
+        if result.get('status') != 'success':
+            print(f"❌ Parse failed: {result or 'stream ended before completion'}")
             return False
+        
+        print(f"✅ Successfully parsed PDF with {result.get('total_pages', 0)} pages!")
+        
+        # Create combined files (pages may arrive out of order)
+        ordered_pages = [pages[num] for num in sorted(pages)]
+        combined_md = "\n\n---\n\n".join([p.get('markdown', '') for p in ordered_pages])
+        combined_nohf = "\n\n---\n\n".join([p.get('markdown_nohf', '') for p in ordered_pages])
+        
+        combined_file = os.path.join(output_dir, f"{base_name}_combined.md")
+        with open(combined_file, 'w', encoding='utf-8') as f:
+            f.write(combined_md)
+        print(f"📄 Saved combined markdown: {combined_file}")
+        
+        combined_nohf_file = os.path.join(output_dir, f"{base_name}_combined_nohf.md")
+        with open(combined_nohf_file, 'w', encoding='utf-8') as f:
+            f.write(combined_nohf)
+        print(f"📄 Saved combined no-hf markdown: {combined_nohf_file}")
+        
+        print(f"\n📊 Summary:")
+        print(f"  Filename: {result.get('filename', 'N/A')}")
+        print(f"  Total pages: {result.get('total_pages', 0)}")
+        print(f"  Prompt mode: {result.get('prompt_mode', 'N/A')}")
+        
+        return True
             
     except requests.exceptions.Timeout:
         print("❌ Request timed out (>95 seconds). The PDF might be too large or complex.")
@@ -236,7 +253,7 @@ def upload_pdf_to_runpod(
         return False
 
 
-def check_runpod_health(pod_id: str) -> bool:
+def check_runpod_health(pod_id: str, session: Optional[requests.Session] = None) -> bool:
     """Check if the RunPod service is healthy."""
     
     base_url = f"https://{pod_id}.proxy.runpod.net"
@@ -245,7 +262,7 @@ def check_runpod_health(pod_id: str) -> bool:
     print(f"🔍 Checking RunPod health: {health_url}")
     
     try:
-        response = requests.get(health_url, timeout=10)
+        response = (session or requests).get(health_url, timeout=10)
         if response.status_code == 200:
             health_data = response.json()
             print(f"✅ RunPod service is healthy!")
@@ -276,13 +293,16 @@ def main():
     
     args = parser.parse_args()
     
+    # Reuse one connection for the health check and the upload
+    session = requests.Session()
+    
     # Health check
     if args.health_check_only:
-        success = check_runpod_health(args.pod_id)
+        success = check_runpod_health(args.pod_id, session)
         sys.exit(0 if success else 1)
     
     # Check service health first
-    if not check_runpod_health(args.pod_id):
+    if not check_runpod_health(args.pod_id, session):
         print("❌ Service health check failed. Aborting upload.")
         sys.exit(1)
     
@@ -294,14 +314,16 @@ def main():
             args.file_path, 
             args.prompt_mode, 
             args.output_dir,
-            args.dpi
+            args.dpi,
+            session=session
         )
     elif any(file_path.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']):
         success = upload_image_to_runpod(
             args.pod_id, 
             args.file_path, 
             args.prompt_mode, 
-            args.output_dir
+            args.output_dir,
+            session=session
         )
     else:
         print("❌ Unsupported file type. Supported: .jpg, .jpeg, .png, .bmp, .tiff, .pdf")
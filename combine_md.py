@@ -3,18 +3,35 @@
 Simple script to combine all _NOHF.md files in output subfolders into one aggregated file.
 """
 
+import io
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Union
 
 OUTPUT_BASE_DIR = "./output"
+MAX_READ_WORKERS = 16
 
+# Splits a filename into alternating text and digit runs
+_NUM_RE = re.compile(r'(\d+)')
 
-def natural_sort_key(filename: str) -> List[Tuple[str, int]]:
+
+def natural_sort_key(filename: str) -> List[Union[str, int]]:
     """Natural sorting for filenames with numbers."""
-    return [(text, int(num)) if num.isdigit() else (text, 0) 
-            for text, num in re.findall(r'([^0-9]*)([0-9]*)', filename)]
+    # Text runs land on even indices and digit runs on odd ones, so keys
+    # only ever compare str with str and int with int
+    return [int(part) if i % 2 else part
+            for i, part in enumerate(_NUM_RE.split(filename))]
+
+
+def read_md_file(md_file: str) -> Tuple[str, Optional[Exception]]:
+    """Read a markdown file, returning its stripped content or the read error."""
+    try:
+        with open(md_file, 'r', encoding='utf-8') as f:
+            return f.read().strip(), None
+    except Exception as e:
+        return "", e
 
 
 def combine_folder_md(folder_path: str) -> str:
@@ -30,33 +47,28 @@ def combine_folder_md(folder_path: str) -> str:
     md_files.sort(key=lambda x: natural_sort_key(os.path.basename(x)))
     
     # Combine content
-    combined_content = []
     folder_name = os.path.basename(folder_path)
     
-    combined_content.append(f"# {folder_name}\n")
+    # Read files concurrently to overlap per-file open/read latency
+    with ThreadPoolExecutor(max_workers=MAX_READ_WORKERS) as executor:
+        contents = list(executor.map(read_md_file, md_files))
     
-    for i, md_file in enumerate(md_files, 1):
+    buf = io.StringIO()
+    buf.write(f"# {folder_name}\n")
+    
+    for i, (md_file, (content, error)) in enumerate(zip(md_files, contents), 1):
         filename = Path(md_file).stem.replace('_NOHF', '')
         
-        try:
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                
-            if content:
-                combined_content.append(f"## Page {i}: {filename}\n")
-                combined_content.append(content)
-                combined_content.append("\n---\n")
-            else:
-                combined_content.append(f"## Page {i}: {filename}\n")
-                combined_content.append("*[Empty content]*")
-                combined_content.append("\n---\n")
-                
-        except Exception as e:
-            combined_content.append(f"## Page {i}: {filename}\n")
-            combined_content.append(f"*[Error reading file: {e}]*")
-            combined_content.append("\n---\n")
+        if error is not None:
+            body = f"*[Error reading file: {error}]*"
+        elif content:
+            body = content
+        else:
+            body = "*[Empty content]*"
+        
+        buf.write(f"\n## Page {i}: {filename}\n\n{body}\n\n---\n")
     
-    return '\n'.join(combined_content)
+    return buf.getvalue()
 
 
 def main():
@@ -11,7 +11,11 @@ from DotsOCR import modeling_dots_ocr_vllm' `which vllm`
 
 # launch vllm server
 model_name=model
-CUDA_VISIBLE_DEVICES=0 vllm serve ${hf_model_path} --tensor-parallel-size 1 --gpu-memory-utilization 0.95  --chat-template-content-format string --served-model-name ${model_name} --trust-remote-code
+VLLM_GPU_MEMORY_UTILIZATION=${VLLM_GPU_MEMORY_UTILIZATION:-0.95}
+VLLM_MAX_NUM_SEQS=${VLLM_MAX_NUM_SEQS:-256}
+VLLM_MAX_NUM_BATCHED_TOKENS=${VLLM_MAX_NUM_BATCHED_TOKENS:-16384}
+VLLM_EXTRA_ARGS=${VLLM_EXTRA_ARGS-"--enable-chunked-prefill --enable-prefix-caching"}
+CUDA_VISIBLE_DEVICES=0 vllm serve ${hf_model_path} --tensor-parallel-size 1 --gpu-memory-utilization ${VLLM_GPU_MEMORY_UTILIZATION} --max-num-seqs ${VLLM_MAX_NUM_SEQS} --max-num-batched-tokens ${VLLM_MAX_NUM_BATCHED_TOKENS} --chat-template-content-format string --served-model-name ${model_name} --trust-remote-code ${VLLM_EXTRA_ARGS}
 
 # # run python demo after launch vllm server
 # python demo/demo_vllm.py
\ No newline at end of file
@@ -7,6 +7,13 @@ import requests
 from dots_ocr.utils.image_utils import PILimage_to_base64
 from openai import OpenAI
 import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_openai_client(addr, api_key):
+    # reuse one client (and its connection pool) per server instead of building one per request
+    return OpenAI(api_key=api_key, base_url=addr)
 
 
 def inference_with_vllm(
@@ -21,7 +28,10 @@ def inference_with_vllm(
         ):
     
     addr = f"http://{ip}:{port}/v1"
-    client = OpenAI(api_key="{}".format(os.environ.get("API_KEY", "0")), base_url=addr)
+    client = get_openai_client(addr, "{}".format(os.environ.get("API_KEY", "0")))
+    # keep the image-then-prompt order the model was trained with; vllm prefix caching
+    # (--enable-prefix-caching) can only reuse the chat-template header before the image,
+    # since the image tokens that follow differ per request
     messages = []
     messages.append(
         {
@@ -72,6 +72,8 @@ def PILimage_to_base64(image, format='PNG'):
 
 
 def to_rgb(pil_image: Image.Image) -> Image.Image:
+    if pil_image.mode == 'RGB':
+        return pil_image  # already RGB, skip the copy made by convert()
     if pil_image.mode == 'RGBA':
         white_background = Image.new("RGB", pil_image.size, (255, 255, 255))
         white_background.paste(pil_image, mask=pil_image.split()[3])  # Use alpha channel as mask
@@ -51,6 +51,7 @@ pip install \
     fastapi \
     "uvicorn[standard]" \
     python-multipart \
+    orjson \
     huggingface_hub \
     modelscope \
     openai \
@@ -81,6 +82,15 @@ fi
 export hf_model_path=./weights/DotsOCR
 export PYTHONPATH=$(dirname "$hf_model_path"):$PYTHONPATH
 
+# vLLM batching settings (override by exporting before running this script).
+# Prefix caching only reuses the chat-template header, since each request's
+# image comes before the prompt; chunked prefill interleaves the image prefill
+# with decoding. Set VLLM_EXTRA_ARGS="" to disable both.
+VLLM_GPU_MEMORY_UTILIZATION=${VLLM_GPU_MEMORY_UTILIZATION:-0.95}
+VLLM_MAX_NUM_SEQS=${VLLM_MAX_NUM_SEQS:-256}
+VLLM_MAX_NUM_BATCHED_TOKENS=${VLLM_MAX_NUM_BATCHED_TOKENS:-16384}
+VLLM_EXTRA_ARGS=${VLLM_EXTRA_ARGS-"--enable-chunked-prefill --enable-prefix-caching"}
+
 # Register DotsOCR model with vLLM (critical step)
 echo "🔧 Registering DotsOCR model with vLLM..."
 VLLM_PATH=$(which vllm)
@@ -108,12 +118,15 @@ start_vllm_server() {
     # Start vLLM server in background
     CUDA_VISIBLE_DEVICES=0 vllm serve ${hf_model_path} \
         --tensor-parallel-size 1 \
-        --gpu-memory-utilization 0.95 \
+        --gpu-memory-utilization ${VLLM_GPU_MEMORY_UTILIZATION} \
+        --max-num-seqs ${VLLM_MAX_NUM_SEQS} \
+        --max-num-batched-tokens ${VLLM_MAX_NUM_BATCHED_TOKENS} \
         --chat-template-content-format string \
         --served-model-name model \
         --trust-remote-code \
         --host 0.0.0.0 \
         --port 8000 \
+        ${VLLM_EXTRA_ARGS} \
         > /workspace/logs/vllm.log 2>&1 &
     
     VLLM_PID=$!